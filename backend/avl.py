@@ -2,40 +2,122 @@
 AVL Tree Implementation for Arabic Roots Storage
 A self-balancing binary search tree for efficient root management
 Each node stores validated derived words with their frequencies
+Roots, words and templates are interned on the way in: they come from a small,
+highly reused vocabulary, so equal keys usually compare by identity
 """
 
-from typing import Optional, List, Tuple, Dict
+import sys
+from array import array
+
+import orjson
+from typing import Optional, List, Tuple, Dict, Iterator, Sequence
 
 
 class AVLNode:
     """Node in the AVL Tree"""
     
+    __slots__ = (
+        'root', 'left', 'right', 'height',
+        '_word_index', '_templates', '_frequencies', '_derived_cache', '_json',
+    )
+    
     def __init__(self, root: str):
         self.root = root  # Arabic root (e.g., "كتب")
         self.left: Optional[AVLNode] = None
         self.right: Optional[AVLNode] = None
         self.height: int = 1
-        # Dictionary storing validated words and their frequency
-        # Format: {"كاتب": {"template": "فَاعِل", "frequency": 5}, ...}
-        self.derived_words: Dict[str, Dict[str, any]] = {}
+        # Validated words stored as parallel arrays (structure of arrays):
+        # _word_index maps each word to its position in _templates/_frequencies
+        self._word_index: Dict[str, int] = {}
+        self._templates: List[str] = []
+        self._frequencies = array('I')
+        # Dict-of-dicts view built on demand, dropped on every mutation
+        self._derived_cache: Optional[Dict[str, Dict[str, any]]] = None
+        # Encoded {"root", "derived_words"} record, dropped on every mutation
+        self._json: Optional[bytes] = None
+    
+    @property
+    def derived_words(self) -> Dict[str, Dict[str, any]]:
+        """
+        Validated words and their frequency
+        Format: {"كاتب": {"template": "فَاعِل", "frequency": 5}, ...}
+        """
+        if self._derived_cache is None:
+            templates = self._templates
+            frequencies = self._frequencies
+            self._derived_cache = {
+                word: {"template": templates[i], "frequency": frequencies[i]}
+                for word, i in self._word_index.items()
+            }
+        return self._derived_cache
+    
+    @derived_words.setter
+    def derived_words(self, words: Dict[str, Dict[str, any]]) -> None:
+        self._word_index = {}
+        self._templates = []
+        self._frequencies = array('I')
+        for word, metadata in words.items():
+            # Skip malformed saved entries (non-string word or template,
+            # missing, negative or non-numeric frequency) rather than failing
+            # the whole load
+            try:
+                word = sys.intern(word)
+                template = sys.intern(metadata.get("template", ""))
+                frequency = array('I', (int(metadata.get("frequency", 1)),))
+            except (AttributeError, TypeError, ValueError, OverflowError):
+                continue
+            self._word_index[word] = len(self._templates)
+            self._templates.append(template)
+            self._frequencies.extend(frequency)
+        self._derived_cache = None
+        self._json = None
+    
+    def _adopt_words(self, other: "AVLNode") -> None:
+        """Take over another node's derived words without copying them"""
+        self._word_index = other._word_index
+        self._templates = other._templates
+        self._frequencies = other._frequencies
+        self._derived_cache = other._derived_cache
+        self._json = None
     
     def add_derived_word(self, word: str, template: str) -> None:
         """Add or increment frequency of a derived word"""
-        if word in self.derived_words:
-            self.derived_words[word]["frequency"] += 1
+        i = self._word_index.get(word)
+        if i is None:
+            self._word_index[word] = len(self._templates)
+            self._templates.append(template)
+            self._frequencies.append(1)
         else:
-            self.derived_words[word] = {
-                "template": template,
-                "frequency": 1
-            }
+            self._frequencies[i] += 1
+        self._derived_cache = None
+        self._json = None
+    
+    def to_json(self) -> bytes:
+        """
+        Get this node's root and derived words as JSON, encoded once per change
+        Indented one level, as an element of the saved roots array
+        """
+        if self._json is None:
+            encoded = orjson.dumps(
+                {"root": self.root, "derived_words": self.derived_words},
+                option=orjson.OPT_INDENT_2,
+            )
+            self._json = b"  " + encoded.replace(b"\n", b"\n  ")
+        return self._json
     
     def get_derived_words(self) -> Dict[str, Dict[str, any]]:
         """Get all derived words with their metadata"""
         return self.derived_words
     
+    def get_word_template(self, word: str) -> Optional[str]:
+        """Get the template a derived word was validated with, if any"""
+        i = self._word_index.get(word)
+        return self._templates[i] if i is not None else None
+    
     def get_word_frequency(self, word: str) -> int:
         """Get frequency of a specific word"""
-        return self.derived_words.get(word, {}).get("frequency", 0)
+        i = self._word_index.get(word)
+        return self._frequencies[i] if i is not None else 0
 
 
 class AVLTree:
@@ -44,16 +126,12 @@ class AVLTree:
     def __init__(self):
         self.root: Optional[AVLNode] = None
         self.size: int = 0
-    
-    def _get_height(self, node: Optional[AVLNode]) -> int:
-        """Get height of a node"""
-        return node.height if node else 0
-    
-    def _get_balance_factor(self, node: Optional[AVLNode]) -> int:
-        """Get balance factor of a node"""
-        if not node:
-            return 0
-        return self._get_height(node.left) - self._get_height(node.right)
+        # Hash index over the tree nodes: the tree keeps the sorted order
+        # and balanced structure, the index answers exact-match lookups in O(1)
+        self._index: Dict[str, AVLNode] = {}
+        # Sorted roots snapshot for the read-mostly listing path,
+        # rebuilt lazily after any insert or delete
+        self._sorted_roots: Optional[List[str]] = None
     
     def _rotate_right(self, node: AVLNode) -> AVLNode:
         """Right rotation"""
@@ -61,9 +139,12 @@ class AVLTree:
         node.left = left_child.right
         left_child.right = node
         
-        # Update heights
-        node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
-        left_child.height = 1 + max(self._get_height(left_child.left), self._get_height(left_child.right))
+        # Update heights (node is now left_child's right child)
+        lh = node.left.height if node.left else 0
+        rh = node.right.height if node.right else 0
+        node.height = 1 + (lh if lh > rh else rh)
+        lh = left_child.left.height if left_child.left else 0
+        left_child.height = 1 + (lh if lh > node.height else node.height)
         
         return left_child
     
@@ -73,98 +154,155 @@ class AVLTree:
         node.right = right_child.left
         right_child.left = node
         
-        # Update heights
-        node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
-        right_child.height = 1 + max(self._get_height(right_child.left), self._get_height(right_child.right))
+        # Update heights (node is now right_child's left child)
+        lh = node.left.height if node.left else 0
+        rh = node.right.height if node.right else 0
+        node.height = 1 + (lh if lh > rh else rh)
+        rh = right_child.right.height if right_child.right else 0
+        right_child.height = 1 + (rh if rh > node.height else node.height)
         
         return right_child
     
+    def _rebalance(self, node: AVLNode, balance: int) -> AVLNode:
+        """Restore the AVL property at node, returns the new subtree root"""
+        # Left heavy
+        if balance > 1:
+            # Left-Right case
+            child = node.left
+            if (child.left.height if child.left else 0) < (child.right.height if child.right else 0):
+                node.left = self._rotate_left(node.left)
+            # Left-Left case
+            return self._rotate_right(node)
+        
+        # Right heavy
+        if balance < -1:
+            # Right-Left case
+            child = node.right
+            if (child.left.height if child.left else 0) > (child.right.height if child.right else 0):
+                node.right = self._rotate_right(node.right)
+            # Right-Right case
+            return self._rotate_left(node)
+        
+        return node
+    
+    def _retrace(self, path: List[AVLNode]) -> None:
+        """
+        Walk back up the descent path updating heights and rebalancing
+        Stops as soon as a subtree keeps its previous height, since no
+        ancestor above it can be affected
+        """
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            lh = node.left.height if node.left else 0
+            rh = node.right.height if node.right else 0
+            new_height = 1 + (lh if lh > rh else rh)
+            balance = lh - rh
+            
+            if -1 <= balance <= 1:
+                # Still balanced: nothing above changes once the height holds
+                if new_height == node.height:
+                    break
+                node.height = new_height
+                continue
+            
+            old_height = node.height
+            node.height = new_height
+            subtree = self._rebalance(node, balance)
+            
+            # Re-attach the rotated subtree to its parent
+            if i == 0:
+                self.root = subtree
+            elif path[i - 1].left is node:
+                path[i - 1].left = subtree
+            else:
+                path[i - 1].right = subtree
+            
+            if subtree.height == old_height:
+                break
+    
     def insert(self, root: str) -> Tuple[bool, str]:
         """
         Insert a root into the AVL tree
         Returns: (success, message)
         """
-        old_size = self.size
-        self.root = self._insert_recursive(self.root, root)
+        root = sys.intern(root)
+        if root in self._index:
+            return False, f"Root '{root}' already exists"
+        
+        new_node = AVLNode(root)
+        self._index[root] = new_node
+        self.size += 1
+        self._sorted_roots = None
         
-        if self.size > old_size:
+        if not self.root:
+            self.root = new_node
             return True, f"Root '{root}' inserted successfully"
-        else:
-            return False, f"Root '{root}' already exists"
-    
-    def _insert_recursive(self, node: Optional[AVLNode], root: str) -> AVLNode:
-        """Recursive insertion with balancing"""
-        # Base case: create new node
-        if not node:
-            self.size += 1
-            return AVLNode(root)
         
-        # Standard BST insertion
-        if root < node.root:
-            node.left = self._insert_recursive(node.left, root)
-        elif root > node.root:
-            node.right = self._insert_recursive(node.right, root)
-        else:
-            # Root already exists - just return without modifying
-            return node
+        # Standard BST descent, remembering the path for rebalancing
+        path = []
+        node = self.root
+        while node:
+            path.append(node)
+            node = node.left if root < node.root else node.right
         
-        # Update height
-        node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
+        parent = path[-1]
+        if root < parent.root:
+            parent.left = new_node
+        else:
+            parent.right = new_node
         
-        # Get balance factor
-        balance_factor = self._get_balance_factor(node)
+        self._retrace(path)
+        return True, f"Root '{root}' inserted successfully"
+    
+    def bulk_insert(self, roots: List[str]) -> int:
+        """
+        Insert many roots at once (e.g. when loading saved data)
+        Rebuilds a perfectly balanced tree from the sorted union of existing
+        and new roots in O(n), with no rotations; existing nodes are reused
+        so their derived words are kept
+        Returns: number of roots inserted
+        """
+        new_roots = {sys.intern(root) for root in roots} - self._index.keys()
+        if not new_roots:
+            return 0
         
-        # Left-Left case
-        if balance_factor > 1 and root < node.left.root:
-            return self._rotate_right(node)
+        # A handful of roots into a large tree is cheaper as plain inserts
+        if len(new_roots) * 4 < self.size:
+            for root in new_roots:
+                self.insert(root)
+            return len(new_roots)
         
-        # Right-Right case
-        if balance_factor < -1 and root > node.right.root:
-            return self._rotate_left(node)
+        for root in new_roots:
+            self._index[root] = AVLNode(root)
         
-        # Left-Right case
-        if balance_factor > 1 and root > node.left.root:
-            node.left = self._rotate_left(node.left)
-            return self._rotate_right(node)
+        ordered = sorted(self._index)
+        self.root = self._build_balanced(ordered, 0, len(ordered) - 1)
+        self.size = len(ordered)
+        self._sorted_roots = ordered
+        return len(new_roots)
+    
+    def _build_balanced(self, ordered: List[str], lo: int, hi: int) -> Optional[AVLNode]:
+        """Link the indexed nodes for ordered[lo..hi] into a balanced subtree, median first"""
+        if lo > hi:
+            return None
         
-        # Right-Left case
-        if balance_factor < -1 and root < node.right.root:
-            node.right = self._rotate_right(node.right)
-            return self._rotate_left(node)
+        mid = (lo + hi) // 2
+        node = self._index[ordered[mid]]
+        node.left = self._build_balanced(ordered, lo, mid - 1)
+        node.right = self._build_balanced(ordered, mid + 1, hi)
         
+        lh = node.left.height if node.left else 0
+        rh = node.right.height if node.right else 0
+        node.height = 1 + (lh if lh > rh else rh)
         return node
     
     def search(self, root: str) -> bool:
         """Search for a root in the tree"""
-        return self._search_recursive(self.root, root)
-    
-    def _search_recursive(self, node: Optional[AVLNode], root: str) -> bool:
-        """Recursive search"""
-        if not node:
-            return False
-        
-        if root == node.root:
-            return True
-        elif root < node.root:
-            return self._search_recursive(node.left, root)
-        else:
-            return self._search_recursive(node.right, root)
-    
-    def _get_node(self, node: Optional[AVLNode], root: str) -> Optional[AVLNode]:
-        """Get the actual node for a root"""
-        if not node:
-            return None
-        
-        if root == node.root:
-            return node
-        elif root < node.root:
-            return self._get_node(node.left, root)
-        else:
-            return self._get_node(node.right, root)
+        return self.get_node(root) is not None
     
     def get_node(self, root: str) -> Optional[AVLNode]:
         """Get the node for a specific root"""
-        return self._get_node(self.root, root)
+        return self._index.get(sys.intern(root))
     
     def add_validated_word(self, root: str, word: str, template: str) -> Tuple[bool, str]:
         """Add a validated word to a root's derived words list"""
@@ -172,9 +310,19 @@ class AVLTree:
         if not node:
             return False, f"Root '{root}' not found in the tree"
         
-        node.add_derived_word(word, template)
+        node.add_derived_word(sys.intern(word), sys.intern(template))
         return True, f"Word '{word}' added to root '{root}'"
     
+    def lookup_validated(self, root: str, word: str) -> Optional[str]:
+        """
+        Reverse lookup: template a word was already validated with for a root
+        Returns None when the root is missing or the word was never validated
+        """
+        node = self.get_node(root)
+        if not node:
+            return None
+        return node.get_word_template(word)
+    
     def get_derived_words(self, root: str) -> Optional[Dict[str, Dict[str, any]]]:
         """Get all derived words for a specific root"""
         node = self.get_node(root)
@@ -187,40 +335,73 @@ class AVLTree:
         In-order traversal of the AVL tree (sorted)
         Returns: List of roots in alphabetical order
         """
+        if self._sorted_roots is None:
+            self._sorted_roots = self._walk_roots()
+        return list(self._sorted_roots)
+    
+    def _walk_roots(self) -> List[str]:
+        """Collect the roots with an explicit-stack in-order walk"""
+        # Walk inlined rather than going through _iter_nodes: this is the
+        # hot enumeration path and skips a generator resume per node
         result = []
-        self._in_order_recursive(self.root, result)
+        append = result.append
+        stack = []
+        node = self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            append(node.root)
+            node = node.right
         return result
     
-    def _in_order_recursive(self, node: Optional[AVLNode], result: List[str]):
-        """Recursive in-order traversal"""
-        if not node:
-            return
-        
-        self._in_order_recursive(node.left, result)
-        result.append(node.root)
-        self._in_order_recursive(node.right, result)
+    def _iter_nodes(self) -> Iterator[AVLNode]:
+        """Iterative in-order walk over the nodes using an explicit stack"""
+        stack = []
+        node = self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
     
     def get_all_roots(self) -> List[str]:
         """Get all roots in sorted order"""
         return self.in_order_traversal()
     
+    def get_all_roots_snapshot(self) -> Sequence[str]:
+        """
+        Get all roots in sorted order without copying them
+        The list is cached and shared between callers until the next mutation,
+        so it must not be modified
+        """
+        if self._sorted_roots is None:
+            self._sorted_roots = self._walk_roots()
+        return self._sorted_roots
+    
+    def iter_roots_with_words(self) -> Iterator[dict]:
+        """
+        Lazily yield each root with its derived words, in sorted order
+        The derived words are the node's own cached view, not a copy
+        """
+        for node in self._iter_nodes():
+            yield {"root": node.root, "derived_words": node.derived_words}
+    
     def get_all_roots_with_words(self) -> List[dict]:
         """Get all roots with their derived words"""
-        result = []
-        self._in_order_with_words(self.root, result)
-        return result
+        return list(self.iter_roots_with_words())
     
-    def _in_order_with_words(self, node: Optional[AVLNode], result: List[dict]):
-        """In-order traversal to collect roots with their derived words"""
-        if not node:
-            return
-        
-        self._in_order_with_words(node.left, result)
-        result.append({
-            "root": node.root,
-            "derived_words": node.derived_words
-        })
-        self._in_order_with_words(node.right, result)
+    def roots_json(self) -> bytes:
+        """
+        Encode all roots with their derived words as a JSON array
+        Reuses each node's cached encoding, so only changed nodes are re-encoded
+        """
+        if not self.root:
+            return b"[]"
+        return b"[\n" + b",\n".join([node.to_json() for node in self._iter_nodes()]) + b"\n]"
     
     def get_size(self) -> int:
         """Get number of unique roots in the tree"""
@@ -228,7 +409,7 @@ class AVLTree:
     
     def get_height(self) -> int:
         """Get height of the tree"""
-        return self._get_height(self.root)
+        return self.root.height if self.root else 0
 
     def _serialize_node(self, node: Optional[AVLNode]) -> Optional[dict]:
         """Serialize AVL node recursively for API response"""
@@ -251,74 +432,71 @@ class AVLTree:
         Delete a root from the AVL tree
         Returns: (success, message)
         """
-        if not self.search(root):
-            return False, f"Root '{root}' not found"
-        
-        old_size = self.size
-        self.root = self._delete_recursive(self.root, root)
+        path = []
+        node = self.root
+        while node and root != node.root:
+            path.append(node)
+            node = node.left if root < node.root else node.right
         
-        if self.size < old_size:
-            return True, f"Root '{root}' deleted successfully"
-        else:
-            return False, f"Failed to delete root '{root}'"
-    
-    def _delete_recursive(self, node: Optional[AVLNode], root: str) -> Optional[AVLNode]:
-        """Recursive deletion with balancing"""
+        # Miss detected by the descent itself, no separate search needed
         if not node:
-            return None
+            return False, f"Root '{root}' not found"
         
-        # Find the node to delete
-        if root < node.root:
-            node.left = self._delete_recursive(node.left, root)
-        elif root > node.root:
-            node.right = self._delete_recursive(node.right, root)
-        else:
-            # Node found - perform deletion
-            self.size -= 1
-            
-            # Case 1: Node with only one child or no child
-            if not node.left:
-                return node.right
-            elif not node.right:
-                return node.left
-            
-            # Case 2: Node with two children
-            # Get the inorder successor (smallest in the right subtree)
-            min_larger_node = self._get_min_node(node.right)
-            node.root = min_larger_node.root
-            node.derived_words = min_larger_node.derived_words  # Preserve derived words
-            node.right = self._delete_recursive(node.right, min_larger_node.root)
-            self.size += 1  # Adjust because we moved the node, not deleted
+        # Node with two children: move the inorder successor (smallest in
+        # the right subtree) into this node and remove the successor instead
+        if node.left and node.right:
+            path.append(node)
+            successor = node.right
+            while successor.left:
+                path.append(successor)
+                successor = successor.left
+            node.root = successor.root
+            node._adopt_words(successor)  # Preserve derived words
+            self._index[node.root] = node
+            node = successor
         
-        # Update height and balance
-        node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
-        balance = self._get_balance_factor(node)
+        # Node with only one child or no child
+        child = node.left if node.left else node.right
+        if not path:
+            self.root = child
+        elif path[-1].left is node:
+            path[-1].left = child
+        else:
+            path[-1].right = child
+        self.size -= 1
+        del self._index[root]
+        self._sorted_roots = None
         
-        # Rebalance if needed
-        # Left Heavy
-        if balance > 1:
-            if self._get_balance_factor(node.left) >= 0:
-                return self._rotate_right(node)
+        self._retrace(path)
+        return True, f"Root '{root}' deleted successfully"
+    
+    def _keeps_position(self, old_root: str, new_root: str) -> bool:
+        """Check whether new_root falls strictly between old_root's in-order neighbours"""
+        lower = upper = None
+        node = self.root
+        while node.root != old_root:
+            if old_root < node.root:
+                upper = node.root
+                node = node.left
             else:
-                node.left = self._rotate_left(node.left)
-                return self._rotate_right(node)
+                lower = node.root
+                node = node.right
         
-        # Right Heavy
-        if balance < -1:
-            if self._get_balance_factor(node.right) <= 0:
-                return self._rotate_left(node)
-            else:
-                node.right = self._rotate_right(node.right)
-                return self._rotate_left(node)
+        # Predecessor is the maximum of the left subtree, if any
+        if node.left:
+            lower = node.left
+            while lower.right:
+                lower = lower.right
+            lower = lower.root
         
-        return node
-    
-    def _get_min_node(self, node: AVLNode) -> AVLNode:
-        """Get node with minimum value in subtree"""
-        current = node
-        while current.left:
-            current = current.left
-        return current
+        # Successor is the minimum of the right subtree, if any
+        if node.right:
+            upper = node.right
+            while upper.left:
+                upper = upper.left
+            upper = upper.root
+        
+        return (lower is None or lower < new_root) and (upper is None or new_root < upper)
     
     def update(self, old_root: str, new_root: str) -> Tuple[bool, str]:
         """
@@ -328,27 +506,31 @@ class AVLTree:
         if len(new_root) != 3:
             return False, "New root must be exactly 3 characters"
         
-        if not self.search(old_root):
-            return False, f"Root '{old_root}' not found"
+        new_root = sys.intern(new_root)
         
-        if self.search(new_root) and old_root != new_root:
-            return False, f"Root '{new_root}' already exists"
+        old_node = self.get_node(old_root)
+        if not old_node:
+            return False, f"Root '{old_root}' not found"
         
         if old_root == new_root:
             return False, "New root is the same as old root"
         
-        # Get derived words from old root before deletion
-        old_node = self.get_node(old_root)
-        derived_words_backup = old_node.derived_words.copy() if old_node else {}
+        if new_root in self._index:
+            return False, f"Root '{new_root}' already exists"
         
-        # Delete old root and insert new one
-        success, _ = self.delete(old_root)
-        if success:
-            self.insert(new_root)
-            # Restore derived words to new node
-            new_node = self.get_node(new_root)
-            if new_node:
-                new_node.derived_words = derived_words_backup
+        # New root sorts into the same in-order slot: rename the node in
+        # place, keeping its derived words and the tree shape untouched
+        if self._keeps_position(old_root, new_root):
+            del self._index[old_root]
+            old_node.root = new_root
+            old_node._json = None
+            self._index[new_root] = old_node
+            self._sorted_roots = None
             return True, f"Root updated from '{old_root}' to '{new_root}'"
-        else:
-            return False, f"Failed to update root"
+        
+        # Insert the new root and hand it the old node's derived words,
+        # then remove the old root
+        self.insert(new_root)
+        self._index[new_root]._adopt_words(old_node)
+        self.delete(old_root)
+        return True, f"Root updated from '{old_root}' to '{new_root}'"
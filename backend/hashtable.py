@@ -1,18 +1,47 @@
 """
 Hash Table Implementation with Collision Handling
 Uses polynomial rolling hash function for efficient pattern storage
+Collisions are chained: each bucket is a compact Python list of entries
+Templates are interned on the way in, so chain compares of stored and
+looked-up templates short-circuit on identity
 """
 
-from typing import List, Optional, Tuple
+import sys
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+
+HASH_PRIME = 31  # Prime for polynomial rolling hash
+HASH_MOD = 10**9 + 7  # Modulo for large numbers
+MAX_LOAD_FACTOR = 0.75  # Grow the table beyond this many entries per bucket
+# Roughly doubling primes used as table sizes when the table grows
+TABLE_SIZES = (101, 211, 431, 863, 1733, 3469, 6947, 13901, 27803)
+
+
+@lru_cache(maxsize=4096)
+def _rolling_hash(template: str) -> int:
+    """
+    Polynomial rolling hash of a template, independent of table size
+    Hash = (p1*31^(k-1) + p2*31^(k-2) + ... + pk) mod MOD
+    where p_i is the Unicode value of the character at position i
+    The bucket index is this hash modulo the table size
+    Memoized: templates form a small closed vocabulary, so each one is
+    only ever hashed once by the interpreter loop
+    """
+    hash_value = 0
+    for char in template:
+        hash_value = (hash_value * HASH_PRIME + ord(char)) % HASH_MOD
+    return hash_value
 
 
 class HashEntry:
     """Entry in the hash table with collision handling (chaining)"""
     
+    __slots__ = ('template', 'hash_value')
+    
     def __init__(self, template: str, hash_value: int):
         self.template = template
         self.hash_value = hash_value
-        self.next: Optional[HashEntry] = None
 
 
 class HashTable:
@@ -21,84 +50,145 @@ class HashTable:
     def __init__(self, initial_size: int = 101):
         """Initialize hash table with prime size for better distribution"""
         self.size = initial_size
-        self.table: List[Optional[HashEntry]] = [None] * initial_size
+        # Each bucket is the collision chain for that index
+        self.table: List[List[HashEntry]] = [[] for _ in range(initial_size)]
         self.count = 0
-        self.prime = 31  # Prime for polynomial rolling hash
-        self.mod = 10**9 + 7  # Modulo for large numbers
+        # Secondary index: template length -> templates of that length
+        self._by_length: Dict[int, Set[str]] = {}
+        # Sorted patterns snapshot, rebuilt lazily after any mutation
+        self._snapshot: Optional[Tuple[str, ...]] = None
     
-    def _polynomial_hash(self, template: str) -> int:
+    def _find(self, template: str) -> Tuple[int, List[HashEntry], Optional[int]]:
         """
-        Polynomial rolling hash function
-        Hash = (p1*31^(k-1) + p2*31^(k-2) + ... + pk) mod MOD
-        where p_i is the Unicode value of the character at position i
+        Locate a template with a single hash computation and chain walk
+        Returns: (full hash value, bucket, position in bucket or None)
         """
-        hash_value = 0
-        for char in template:
-            hash_value = (hash_value * self.prime + ord(char)) % self.mod
-        return hash_value % self.size
+        hash_value = _rolling_hash(template)
+        bucket = self.table[hash_value % self.size]
+        
+        for position, entry in enumerate(bucket):
+            # Cheap integer compare first, string compare only on a hash match
+            if entry.hash_value == hash_value and entry.template == template:
+                return hash_value, bucket, position
+        
+        return hash_value, bucket, None
     
     def put(self, template: str) -> Tuple[bool, str]:
         """
         Insert a pattern in the hash table
         Returns: (success, message)
         """
+        template = sys.intern(template)
+        hash_value, bucket, position = self._find(template)
+        
         # Check if pattern already exists
-        if self.exists(template):
+        if position is not None:
             return False, f"Pattern '{template}' already exists"
         
-        hash_index = self._polynomial_hash(template)
-        hash_value = self._compute_full_hash(template)
-        
-        # Insert new pattern at the beginning (O(1) time)
-        new_entry = HashEntry(template, hash_value)
-        new_entry.next = self.table[hash_index]
-        self.table[hash_index] = new_entry
+        # Append new pattern to its bucket's chain (amortized O(1) time)
+        bucket.append(HashEntry(template, hash_value))
         self.count += 1
+        self._by_length.setdefault(len(template), set()).add(template)
+        self._snapshot = None
+        
+        if self.count > MAX_LOAD_FACTOR * self.size:
+            self._resize(self._next_size(self.size))
         
         return True, f"Pattern '{template}' inserted successfully"
     
-    def get(self, template: str) -> bool:
-        """Check if template exists in hash table"""
-        return self.exists(template)
+    def bulk_put(self, templates: List[str]) -> int:
+        """
+        Insert many patterns at once (e.g. when loading saved data)
+        Duplicates are skipped silently instead of building a message for each
+        Returns: number of patterns inserted
+        """
+        inserted = 0
+        
+        for template in dict.fromkeys(map(sys.intern, templates)):
+            hash_value, bucket, position = self._find(template)
+            if position is None:
+                bucket.append(HashEntry(template, hash_value))
+                self._by_length.setdefault(len(template), set()).add(template)
+                inserted += 1
+        
+        self.count += inserted
+        if inserted:
+            self._snapshot = None
+        
+        # Grow once for the whole batch rather than step by step
+        new_size = self.size
+        while self.count > MAX_LOAD_FACTOR * new_size:
+            new_size = self._next_size(new_size)
+        if new_size != self.size:
+            self._resize(new_size)
+        
+        return inserted
+    
+    def _next_size(self, size: int) -> int:
+        """Next table size after size: the next prime step, or 2n+1 past the table"""
+        for candidate in TABLE_SIZES:
+            if candidate > size:
+                return candidate
+        return size * 2 + 1
+    
+    def _resize(self, new_size: int) -> None:
+        """Grow the table, redistributing entries by their stored full hash"""
+        table: List[List[HashEntry]] = [[] for _ in range(new_size)]
+        
+        for bucket in self.table:
+            for entry in bucket:
+                table[entry.hash_value % new_size].append(entry)
+        
+        self.table = table
+        self.size = new_size
     
     def get_all_patterns(self) -> List[str]:
         """
         Get all patterns in the hash table
         Returns: List of template strings
         """
-        patterns = []
-        
-        for bucket in self.table:
-            current = bucket
-            while current:
-                patterns.append(current.template)
-                current = current.next
-        
-        # Sort patterns for consistent ordering
-        patterns.sort()
-        return patterns
+        return list(self.get_all_patterns_snapshot())
+    
+    def get_all_patterns_snapshot(self) -> Tuple[str, ...]:
+        """
+        Get all patterns as an immutable sorted tuple
+        The tuple is cached and shared between callers until the next mutation
+        """
+        if self._snapshot is None:
+            patterns = [entry.template for bucket in self.table for entry in bucket]
+            
+            # Sort patterns for consistent ordering
+            patterns.sort()
+            self._snapshot = tuple(patterns)
+        return self._snapshot
     
     def delete(self, template: str) -> Tuple[bool, str]:
         """Delete a pattern from the hash table"""
-        hash_index = self._polynomial_hash(template)
-        
-        current = self.table[hash_index]
-        prev = None
-        
-        while current:
-            if current.template == template:
-                if prev:
-                    prev.next = current.next
-                else:
-                    self.table[hash_index] = current.next
-                
-                self.count -= 1
-                return True, f"Pattern '{template}' deleted successfully"
-            
-            prev = current
-            current = current.next
+        template = sys.intern(template)
+        _, bucket, position = self._find(template)
+        
+        if position is None:
+            return False, f"Pattern '{template}' not found"
         
-        return False, f"Pattern '{template}' not found"
+        del bucket[position]
+        self.count -= 1
+        self._unindex_length(template)
+        self._snapshot = None
+        return True, f"Pattern '{template}' deleted successfully"
+    
+    def _unindex_length(self, template: str) -> None:
+        """Drop a template from the length index"""
+        same_length = self._by_length[len(template)]
+        same_length.discard(template)
+        if not same_length:
+            del self._by_length[len(template)]
+    
+    def get_patterns_by_length(self) -> Dict[int, Set[str]]:
+        """
+        Get the templates grouped by length (read-only view, do not mutate)
+        Lets callers consider only templates of a plausible length
+        """
+        return self._by_length
     
     def get_size(self) -> int:
         """Get number of patterns in the hash table"""
@@ -108,42 +198,51 @@ class HashTable:
         """Get load factor (count / table size)"""
         return self.count / self.size if self.size > 0 else 0
     
-    def _compute_full_hash(self, template: str) -> int:
-        """Compute full hash value for debugging/display"""
-        return self._polynomial_hash(template)
-    
     def exists(self, template: str) -> bool:
         """Check if pattern exists"""
-        hash_index = self._polynomial_hash(template)
+        template = sys.intern(template)
+        hash_value = _rolling_hash(template)
         
-        current = self.table[hash_index]
-        while current:
-            if current.template == template:
+        # Read-only hot path: scan the chain directly rather than via _find
+        for entry in self.table[hash_value % self.size]:
+            if entry.hash_value == hash_value and entry.template == template:
                 return True
-            current = current.next
         
         return False
     
+    # Map-style alias: same lookup, no extra call frame
+    get = exists
+    
     def update(self, old_template: str, new_template: str) -> Tuple[bool, str]:
         """
         Update a pattern (change template)
         Returns: (success, message)
         """
+        old_template = sys.intern(old_template)
+        new_template = sys.intern(new_template)
         # Check if old pattern exists
-        if not self.exists(old_template):
+        _, old_bucket, old_position = self._find(old_template)
+        if old_position is None:
             return False, f"Pattern '{old_template}' not found"
         
         # Check if new template already exists
-        if old_template != new_template and self.exists(new_template):
+        new_hash, new_bucket, new_position = self._find(new_template)
+        if old_template != new_template and new_position is not None:
             return False, f"Pattern '{new_template}' already exists"
         
-        # Delete old pattern and insert new one
-        success, _ = self.delete(old_template)
-        if success:
-            self.put(new_template)
-            return True, f"Pattern updated from '{old_template}' to '{new_template}'"
-        else:
-            return False, f"Failed to update pattern"
+        entry = old_bucket[old_position]
+        entry.template = new_template
+        self._unindex_length(old_template)
+        self._by_length.setdefault(len(new_template), set()).add(new_template)
+        self._snapshot = None
+        entry.hash_value = new_hash
+        
+        # Same bucket: the entry is rewritten in place, otherwise move it
+        if new_bucket is not old_bucket:
+            del old_bucket[old_position]
+            new_bucket.append(entry)
+        
+        return True, f"Pattern updated from '{old_template}' to '{new_template}'"
 
     def get_table_structure(self) -> dict:
         """Return full hash table bucket structure for visualization"""
@@ -152,15 +251,13 @@ class HashTable:
         collisions = 0
 
         for index, bucket in enumerate(self.table):
-            chain = []
-            current = bucket
-
-            while current:
-                chain.append({
-                    "template": current.template,
-                    "hash_value": current.hash_value,
-                })
-                current = current.next
+            chain = [
+                {
+                    "template": entry.template,
+                    "hash_value": entry.hash_value,
+                }
+                for entry in bucket
+            ]
 
             if chain:
                 non_empty_buckets += 1
@@ -3,23 +3,54 @@ FastAPI Backend for Arabic Morphological Search Engine
 Exposes endpoints for root management, pattern management, and morphological operations
 """
 
-from fastapi import FastAPI, File, UploadFile
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, File, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-import json
+from typing import Any, AsyncIterator, List, Optional, Sequence
+import asyncio
+import codecs
+import orjson
 import os
+import re
 
 from avl import AVLTree
 from hashtable import HashTable
 from morphology import MorphologicalEngine
 
 
+class ORJSONResponse(JSONResponse):
+    """JSON response encoded with orjson (UTF-8 Arabic text is written as-is)"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the write-behind saver for the lifetime of the app"""
+    global _dirty
+    _dirty = asyncio.Event()
+    saver = asyncio.create_task(_save_worker())
+    yield
+    saver.cancel()
+    with suppress(asyncio.CancelledError):
+        await saver
+    # Flush anything still pending so no mutation is lost on shutdown
+    if _dirty.is_set():
+        save_data()
+    _dirty = None
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Arabic Morphological Search Engine",
     description="A full-stack application for Arabic morphological analysis",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware for React frontend
@@ -44,6 +75,25 @@ PATTERNS_FILE = os.path.join(DATA_DIR, "patterns.json")
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
+# Write-behind persistence: mutations only mark the data dirty, and a
+# background task writes it out once per burst instead of once per request
+SAVE_DELAY = 0.2  # Seconds to wait for further mutations before writing
+_dirty: Optional[asyncio.Event] = None
+
+# Pre-serialized visualization payloads, dropped on every mutation
+_tree_json: Optional[bytes] = None
+_table_json: Optional[bytes] = None
+
+# Uploaded root files are read and parsed in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Full root/pattern listings are streamed this many items at a time
+STREAM_BATCH_SIZE = 1024
+
+# Threading model: the AVL tree and hash table are only ever mutated on the
+# event loop thread. Pure CPU work over a snapshot (derivation, validation)
+# and file writes run in the threadpool so they don't block other requests.
+
 
 # Pydantic models
 class RootRequest(BaseModel):
@@ -79,82 +129,118 @@ class ValidatorRequest(BaseModel):
     root: str
 
 
-class StatsResponse(BaseModel):
-    total_roots: int
-    total_patterns: int
-    avl_height: int
-    hash_load_factor: float
+# ==================== Utility Functions ====================
 
+# Arabic Unicode ranges:
+# Basic Arabic: U+0600 to U+06FF
+# Arabic Supplement: U+0750 to U+077F
+# Arabic Extended-A: U+08A0 to U+08FF
+ARABIC_RE = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]+')
+# Uploaded text made only of Arabic letters and LF/CRLF line breaks: every
+# line in it is already known to be Arabic once stripped
+ARABIC_LINES_RE = re.compile(r'(?:[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]|\r?\n)*')
 
-# ==================== Utility Functions ====================
 
 def is_arabic_text(text: str) -> bool:
     """Check if text contains only Arabic letters"""
-    if not text:
-        return False
-    
-    # Arabic Unicode ranges:
-    # Basic Arabic: U+0600 to U+06FF
-    # Arabic Supplement: U+0750 to U+077F
-    # Arabic Extended-A: U+08A0 to U+08FF
-    for char in text:
-        code = ord(char)
-        if not ((0x0600 <= code <= 0x06FF) or 
-                (0x0750 <= code <= 0x077F) or 
-                (0x08A0 <= code <= 0x08FF)):
-            return False
-    return True
+    return bool(text) and ARABIC_RE.fullmatch(text) is not None
 
 
 def save_data():
     """Save roots and patterns to JSON files"""
+    write_data(avl_tree.roots_json(), hash_table.get_all_patterns_snapshot())
+
+
+def write_data(roots_json: bytes, patterns: Sequence[str]):
+    """Write a snapshot of roots and patterns to the JSON files"""
     try:
-        # Save roots with derived words
-        roots_with_words = avl_tree.get_all_roots_with_words()
-        with open(ROOTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(roots_with_words, f, ensure_ascii=False, indent=2)
+        # Save roots with derived words, already encoded by the tree
+        with open(ROOTS_FILE, 'wb') as f:
+            f.write(roots_json)
         
         # Save patterns
-        patterns = hash_table.get_all_patterns()
-        with open(PATTERNS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(patterns, f, ensure_ascii=False, indent=2)
+        with open(PATTERNS_FILE, 'wb') as f:
+            f.write(orjson.dumps(patterns, option=orjson.OPT_INDENT_2))
     except Exception as e:
         print(f"Error saving data: {e}")
 
 
+def mark_dirty():
+    """Schedule a save of roots and patterns on the background writer"""
+    global _tree_json, _table_json
+    _tree_json = _table_json = None
+    
+    if _dirty is None:
+        # Writer not running (app not started): save synchronously
+        save_data()
+    else:
+        _dirty.set()
+
+
+async def _save_worker():
+    """Coalesce bursts of mutations into a single write off the event loop"""
+    while True:
+        await _dirty.wait()
+        await asyncio.sleep(SAVE_DELAY)
+        _dirty.clear()
+        try:
+            # Snapshot on the event loop, where all mutations happen, then let
+            # a worker thread do the file I/O. Only nodes changed since the
+            # last save are re-encoded
+            roots_json = avl_tree.roots_json()
+            patterns = hash_table.get_all_patterns_snapshot()
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            continue
+        
+        # Cancelling the task cannot stop the thread, so on shutdown wait
+        # for the write in progress before the final flush writes the files
+        write = asyncio.ensure_future(run_in_threadpool(write_data, roots_json, patterns))
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            await write
+            raise
+
+
 def load_data():
     """Load roots and patterns from JSON files"""
+    # Roots and patterns are loaded independently, so a bad roots file
+    # cannot keep the patterns from loading (and be saved over as empty)
     try:
         # Load roots with derived words
         if os.path.exists(ROOTS_FILE):
-            with open(ROOTS_FILE, 'r', encoding='utf-8') as f:
-                roots_data = json.load(f)
+            with open(ROOTS_FILE, 'rb') as f:
+                roots_data = orjson.loads(f.read())
                 
                 # Handle both old format (list of strings) and new format (list of dicts)
                 if isinstance(roots_data, list) and len(roots_data) > 0:
                     if isinstance(roots_data[0], str):
                         # Old format: just root strings
-                        for root in roots_data:
-                            avl_tree.insert(root)
+                        avl_tree.bulk_insert(roots_data)
                     elif isinstance(roots_data[0], dict):
                         # New format: root with derived words
+                        avl_tree.bulk_insert([
+                            root_obj["root"] for root_obj in roots_data if root_obj.get("root")
+                        ])
                         for root_obj in roots_data:
                             root = root_obj.get("root")
-                            if root:
-                                avl_tree.insert(root)
+                            if root and "derived_words" in root_obj:
                                 # Load derived words
                                 node = avl_tree.get_node(root)
-                                if node and "derived_words" in root_obj:
+                                if node:
                                     node.derived_words = root_obj["derived_words"]
-        
+    except Exception as e:
+        print(f"Error loading roots: {e}")
+    
+    try:
         # Load patterns
         if os.path.exists(PATTERNS_FILE):
-            with open(PATTERNS_FILE, 'r', encoding='utf-8') as f:
-                patterns = json.load(f)
-                for template in patterns:
-                    hash_table.put(template)
+            with open(PATTERNS_FILE, 'rb') as f:
+                patterns = orjson.loads(f.read())
+                hash_table.bulk_put(patterns)
     except Exception as e:
-        print(f"Error loading data: {e}")
+        print(f"Error loading patterns: {e}")
 
 
 # Load data on startup
@@ -163,15 +249,18 @@ load_data()
 
 # ==================== Dashboard/Stats Endpoints ====================
 
-@app.get("/api/stats", response_model=StatsResponse)
+# Hot read endpoints return ORJSONResponse directly, skipping FastAPI's
+# jsonable_encoder / response model pass over the payload
+
+@app.get("/api/stats")
 async def get_stats():
     """Get dashboard statistics"""
-    return StatsResponse(
-        total_roots=avl_tree.get_size(),
-        total_patterns=hash_table.get_size(),
-        avl_height=avl_tree.get_height(),
-        hash_load_factor=hash_table.get_load_factor()
-    )
+    return ORJSONResponse({
+        "total_roots": avl_tree.get_size(),
+        "total_patterns": hash_table.get_size(),
+        "avl_height": avl_tree.get_height(),
+        "hash_load_factor": hash_table.get_load_factor()
+    })
 
 
 # ==================== Root Management Endpoints ====================
@@ -192,7 +281,7 @@ async def add_root(request: RootRequest):
         }
     
     success, message = avl_tree.insert(request.root)
-    save_data()
+    mark_dirty()
     
     return {
         "success": success,
@@ -205,16 +294,38 @@ async def add_root(request: RootRequest):
 async def upload_roots(file: UploadFile = File(...)):
     """Upload a text file with roots (one root per line)"""
     try:
-        # Read the uploaded file
-        contents = await file.read()
-        text = contents.decode('utf-8')
-        
-        # Parse roots from file (one per line)
-        lines = text.strip().split('\n')
-        roots = [line.strip() for line in lines if line.strip()]
+        # Read the uploaded file in chunks, parsing roots (one per line)
+        # as they arrive instead of buffering the whole upload
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        roots = []
+        pending = ""
+        all_arabic = True
+        carried_cr = ""
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            text = decoder.decode(chunk, final=not chunk)
+            # Check the whole chunk in one regex pass, so the per-root
+            # Arabic check can be skipped for well-formed uploads. A CR ending
+            # a chunk may be the first half of a CRLF split across chunks, so
+            # it is checked together with the next one; left over at the end
+            # of the file it is trailing whitespace that strip() removes
+            if all_arabic:
+                probe = carried_cr + text
+                carried_cr = "\r" if probe.endswith("\r") else ""
+                if carried_cr:
+                    probe = probe[:-1]
+                if ARABIC_LINES_RE.fullmatch(probe) is None:
+                    all_arabic = False
+            lines = (pending + text).split('\n')
+            pending = lines.pop()
+            roots.extend(line.strip() for line in lines if line.strip())
+            if not chunk:
+                break
+        if pending.strip():
+            roots.append(pending.strip())
         
-        # Validate and insert roots
-        added_count = 0
+        # Validate roots, then insert them all at once
+        new_roots = {}
         skipped_count = 0
         errors = []
         
@@ -224,20 +335,24 @@ async def upload_roots(file: UploadFile = File(...)):
                 errors.append(f"Skipped '{root}': must be exactly 3 characters")
                 continue
             
-            if not is_arabic_text(root):
+            if not all_arabic and not is_arabic_text(root):
                 skipped_count += 1
                 errors.append(f"Skipped '{root}': must contain only Arabic letters")
                 continue
             
-            success, message = avl_tree.insert(root)
-            if success:
-                added_count += 1
-            else:
+            if root in new_roots or avl_tree.search(root):
                 skipped_count += 1
-                errors.append(f"Skipped '{root}': {message}")
+                errors.append(f"Skipped '{root}': Root '{root}' already exists")
+                continue
+            
+            new_roots[root] = None
+        
+        # Rebuilds the tree in one pass instead of one insert per root when
+        # the upload is large compared to the tree
+        added_count = avl_tree.bulk_insert(list(new_roots))
         
         # Save to JSON
-        save_data()
+        mark_dirty()
         
         return {
             "success": True,
@@ -255,25 +370,38 @@ async def upload_roots(file: UploadFile = File(...)):
         }
 
 
+async def stream_json_list(key: str, items: Sequence[str]) -> AsyncIterator[bytes]:
+    """
+    Stream {key: [...items], "count": n} as JSON, encoding a batch of items at a time
+    items must be a snapshot that is not modified while streaming
+    """
+    yield b'{"' + key.encode() + b'":['
+    for start in range(0, len(items), STREAM_BATCH_SIZE):
+        # Encode the batch as a JSON array and keep only its elements
+        batch = orjson.dumps(items[start:start + STREAM_BATCH_SIZE])[1:-1]
+        yield batch if start == 0 else b"," + batch
+    yield b'],"count":' + str(len(items)).encode() + b"}"
+
+
 @app.get("/api/roots/all")
 async def get_all_roots():
     """Get all roots in sorted order (in-order traversal of AVL tree)"""
-    roots = avl_tree.get_all_roots()
-    return {
-        "roots": roots,
-        "count": len(roots)
-    }
+    roots = avl_tree.get_all_roots_snapshot()
+    return StreamingResponse(stream_json_list("roots", roots), media_type="application/json")
 
 
 @app.get("/api/roots/tree")
 async def get_roots_tree():
     """Get full AVL tree structure for graphical visualization"""
-    return {
-        "success": True,
-        "tree": avl_tree.get_tree_structure(),
-        "height": avl_tree.get_height(),
-        "count": avl_tree.get_size()
-    }
+    global _tree_json
+    if _tree_json is None:
+        _tree_json = orjson.dumps({
+            "success": True,
+            "tree": avl_tree.get_tree_structure(),
+            "height": avl_tree.get_height(),
+            "count": avl_tree.get_size()
+        })
+    return Response(_tree_json, media_type="application/json")
 
 
 @app.get("/api/roots/search/{root}")
@@ -292,7 +420,7 @@ async def delete_root(root: str):
     success, message = avl_tree.delete(root)
     
     if success:
-        save_data()
+        mark_dirty()
     
     return {
         "success": success,
@@ -319,7 +447,7 @@ async def update_root(request: RootUpdateRequest):
     success, message = avl_tree.update(request.old_root, request.new_root)
     
     if success:
-        save_data()
+        mark_dirty()
     
     return {
         "success": success,
@@ -362,7 +490,7 @@ async def add_pattern(request: PatternRequest):
         }
     
     success, message = hash_table.put(request.template)
-    save_data()
+    mark_dirty()
     
     return {
         "success": success,
@@ -374,20 +502,20 @@ async def add_pattern(request: PatternRequest):
 @app.get("/api/patterns/all")
 async def get_all_patterns():
     """Get all patterns from the hash table"""
-    patterns = hash_table.get_all_patterns()
-    return {
-        "patterns": patterns,
-        "count": len(patterns)
-    }
+    patterns = hash_table.get_all_patterns_snapshot()
+    return StreamingResponse(stream_json_list("patterns", patterns), media_type="application/json")
 
 
 @app.get("/api/patterns/table")
 async def get_patterns_table():
     """Get full hash table bucket structure for graphical visualization"""
-    return {
-        "success": True,
-        "table": hash_table.get_table_structure()
-    }
+    global _table_json
+    if _table_json is None:
+        _table_json = orjson.dumps({
+            "success": True,
+            "table": hash_table.get_table_structure()
+        })
+    return Response(_table_json, media_type="application/json")
 
 
 @app.get("/api/patterns/{template}")
@@ -404,7 +532,7 @@ async def get_pattern(template: str):
 async def delete_pattern(template: str):
     """Delete a pattern from the hash table"""
     success, message = hash_table.delete(template)
-    save_data()
+    mark_dirty()
     
     return {
         "success": success,
@@ -428,7 +556,7 @@ async def update_pattern(request: PatternUpdateRequest):
     )
     
     if success:
-        save_data()
+        mark_dirty()
     
     return {
         "success": success,
@@ -470,7 +598,7 @@ async def generate_word(request: GeneratorRequest):
 
     if generated_word:
         avl_tree.add_validated_word(request.root, generated_word, request.template)
-        save_data()
+        mark_dirty()
     
     return {
         "success": True,
@@ -509,7 +637,8 @@ async def generate_multiple(request: GeneratorMultiRequest):
     derivatives = []
     skipped = []
 
-    for template in request.templates:
+    # Duplicate templates in one request are generated (and counted) once
+    for template in dict.fromkeys(request.templates):
         if not hash_table.exists(template):
             skipped.append(template)
             continue
@@ -523,7 +652,7 @@ async def generate_multiple(request: GeneratorMultiRequest):
             avl_tree.add_validated_word(request.root, generated_word, template)
 
     if derivatives:
-        save_data()
+        mark_dirty()
 
     return {
         "success": True,
@@ -553,21 +682,25 @@ async def generate_derivatives(request: RootRequest):
         }
     
     # Generate all derivatives
-    all_patterns = hash_table.get_all_patterns()
-    derivatives = MorphologicalEngine.generate_derivatives(request.root, all_patterns)
+    all_patterns = hash_table.get_all_patterns_snapshot()
+    derivatives = await run_in_threadpool(
+        MorphologicalEngine.generate_derivatives, request.root, all_patterns
+    )
 
     if derivatives:
-        for deriv in derivatives:
-            template = deriv.get("template")
-            word = deriv.get("generated_word")
-            if template and word:
-                avl_tree.add_validated_word(request.root, word, template)
-        save_data()
+        for template, word in derivatives:
+            avl_tree.add_validated_word(request.root, word, template)
+        mark_dirty()
     
+    # The frontend reads each derivative by field name, so the response
+    # still spells them out as objects
     return {
         "success": True,
         "root": request.root,
-        "derivatives": derivatives,
+        "derivatives": [
+            {"template": template, "generated_word": word}
+            for template, word in derivatives
+        ],
         "count": len(derivatives)
     }
 
@@ -594,14 +727,29 @@ async def validate_word(request: ValidatorRequest):
             "template_used": None
         }
     
-    # Validate the word
-    all_patterns = hash_table.get_all_patterns()
-    is_valid, template_used = MorphologicalEngine.validate_word(request.word, request.root, all_patterns)
+    # Previously validated words are answered from the root's reverse index,
+    # as long as the template still exists and still derives this word from
+    # this root (renamed roots keep their words, and saved data may be stale)
+    template_used = avl_tree.lookup_validated(request.root, request.word)
+    if (
+        template_used
+        and hash_table.exists(template_used)
+        and MorphologicalEngine.apply_root_to_pattern(request.root, template_used) == request.word
+    ):
+        is_valid = True
+    else:
+        # Validate the word against the patterns of a compatible length only
+        candidates = MorphologicalEngine.candidate_patterns(
+            request.word, request.root, hash_table.get_patterns_by_length()
+        )
+        is_valid, template_used = await run_in_threadpool(
+            MorphologicalEngine.validate_word, request.word, request.root, candidates
+        )
     
     # Store validated word if verification succeeds
     if is_valid and template_used:
         avl_tree.add_validated_word(request.root, request.word, template_used)
-        save_data()  # Persist the validated word
+        mark_dirty()  # Persist the validated word
     
     return {
         "success": True,
@@ -627,4 +775,6 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    # uvloop and httptools when installed (uvicorn[standard]), asyncio and
+    # h11 otherwise. A single worker: the tree and table live in this process
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto", log_level="warning")
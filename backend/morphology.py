@@ -3,25 +3,61 @@ Morphological Generator and Validator
 Implements the morphological generation and validation logic with comprehensive Arabic phonological rules
 """
 
-from typing import Tuple, Optional, List
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+
+# Root letter position for every placeholder a template may use:
+# Arabic notation (ف ع ل), numeric markers (1 2 3) and legacy English (F A L)
+ROOT_POSITIONS = {
+    'ف': 0, 'ع': 1, 'ل': 2,
+    '1': 0, '2': 1, '3': 2,
+    'F': 0, 'A': 1, 'L': 2,
+}
+
+SHADDA = 'ّ'
+
+# Letter classes used by the phonological rules, as frozensets for O(1)
+# membership tests
+_WEAK = frozenset('وي')  # Weak radicals
+_EMPHATIC = frozenset('صضطظ')  # Emphatic consonants
+_DENTAL = frozenset('دذز')  # Dental consonants
+_LABIAL = frozenset('بم')  # Labial consonants
+
+
+@lru_cache(maxsize=4096)
+def _compile_template(template: str) -> Tuple[Tuple[str, int], ...]:
+    """
+    Split a template once into (literal chunk, root position) segments
+    The position is the root letter that follows the chunk, or -1 for a
+    trailing chunk with no placeholder after it
+    
+    Example: "فَاعِل" -> (('', 0), ('َا', 1), ('ِ', 2))
+    """
+    segments = []
+    chunk_start = 0
+    for i, char in enumerate(template):
+        position = ROOT_POSITIONS.get(char)
+        if position is not None:
+            segments.append((template[chunk_start:i], position))
+            chunk_start = i + 1
+    if chunk_start < len(template):
+        segments.append((template[chunk_start:], -1))
+    return tuple(segments)
 
 
 class MorphologicalEngine:
     """Handles morphological generation and validation"""
     
-    # Weak radicals
-    WEAK_LETTERS = ['و', 'ي']
-    
-    # Emphatic consonants
-    EMPHATIC = ['ص', 'ض', 'ط', 'ظ']
-    
-    # Dental consonants
-    DENTAL = ['د', 'ذ', 'ز']
-    
-    # Labial consonants
-    LABIAL = ['ب', 'م']
+    # Letter classes (module-level frozensets, exposed here for callers)
+    WEAK_LETTERS = _WEAK
+    EMPHATIC = _EMPHATIC
+    DENTAL = _DENTAL
+    LABIAL = _LABIAL
     
     @staticmethod
+    @lru_cache(maxsize=8192)
     def is_weak_root(root: str) -> tuple:
         """
         Detect weak root type
@@ -35,11 +71,11 @@ class MorphologicalEngine:
         if len(root) != 3:
             return ('sound', None)
         
-        if root[0] in MorphologicalEngine.WEAK_LETTERS:
+        if root[0] in _WEAK:
             return ('assimilated', 0)
-        if root[1] in MorphologicalEngine.WEAK_LETTERS:
+        if root[1] in _WEAK:
             return ('hollow', 1)
-        if root[2] in MorphologicalEngine.WEAK_LETTERS:
+        if root[2] in _WEAK:
             return ('defective', 2)
         if root[1] == root[2]:
             return ('doubled', (1, 2))
@@ -47,110 +83,91 @@ class MorphologicalEngine:
         return ('sound', None)
     
     @staticmethod
-    def apply_form8_assimilation(word: str, root: str) -> str:
+    def apply_defective_root_rules(word: str, root: str) -> str:
         """
-        RULE A — Form VIII Assimilation (افتعل)
+        Handle defective roots (C3 weak: و/ي)
         
-        A1: Emphatic Spread (ص ض ط ظ): ت → ط
-        A2: Dental Idghām (د ذ ز): C1ت → C1ّ
-        A3: ث case: ثت → ثّ
-        A4: Default: no change
+        Rule: Final weak radical → ā in past tense
+        Examples:
+            رمي → رمى
+            دعو → دعا
         """
         if len(root) != 3:
             return word
         
-        c1 = root[0]
-        
-        # A1: Emphatic spread (ت → ط)
-        if c1 in MorphologicalEngine.EMPHATIC:
-            word = word.replace(c1 + 'ت', c1 + 'ط')
-        
-        # A2: Dental idghām (assimilation with shadda)
-        elif c1 in MorphologicalEngine.DENTAL:
-            word = word.replace(c1 + 'ت', c1 + 'ّ')
-        
-        # A3: ث case
-        elif c1 == 'ث':
-            word = word.replace('ثت', 'ثّ')
+        c3 = root[2]
         
-        # A4: Default - no change
+        # If C3 is weak
+        if c3 in _WEAK:
+            # Final weak → ى in many contexts
+            if word.endswith(c3):
+                word = word[:-1] + 'ى'
         
         return word
     
     @staticmethod
-    def apply_form7_assimilation(word: str, root: str) -> str:
+    @lru_cache(maxsize=8192)
+    def compile_root_rules(root: str) -> Optional[Tuple[Pattern, Dict[str, str]]]:
         """
-        RULE B — Form VII Assimilation (انفعل)
+        Fuse every substitution rule that applies to a root into one regex
         
-        If C1 ∈ {ب م}: ن → م
+        Hollow roots (C2 weak: و/ي)
+            Rule: aC2 between vowels → long vowel
+            Examples:
+                قول → قال (qāla)
+                بيع → باع (bāʿa)
         
-        Examples:
-            انبعث → امبعث
-            انبنى → امبنى
-        """
-        if len(root) != 3:
-            return word
+        RULE A — Form VIII Assimilation (افتعل)
+            A1: Emphatic Spread (ص ض ط ظ): ت → ط
+            A2: Dental Idghām (د ذ ز): C1ت → C1ّ
+            A3: ث case: ثت → ثّ
+            A4: Default: no change
         
-        c1 = root[0]
+        RULE B — Form VII Assimilation (انفعل)
+            If C1 ∈ {ب م}: ن → م
+            Examples:
+                انبعث → امبعث
+                انبنى → امبنى
         
-        # If C1 is labial, n → m
-        if c1 in MorphologicalEngine.LABIAL:
-            word = word.replace('ن' + c1, 'م' + c1)
+        Each rule only consumes the characters it rewrites and checks C1
+        through a lookbehind/lookahead, so one left-to-right re.sub pass gives
+        the same result as applying the rules one after the other.
         
-        return word
-    
-    @staticmethod
-    def apply_hollow_root_rules(word: str, root: str) -> str:
-        """
-        Handle hollow roots (C2 weak: و/ي)
-        
-        Rule: aC2 between vowels → long vowel
-        Examples:
-            قول → قال (qāla)
-            بيع → باع (bāʿa)
+        Returns: (compiled pattern, matched text -> replacement), or None
+        when no rule applies to the root
         """
         if len(root) != 3:
-            return word
+            return None
         
-        c1, c2, c3 = root[0], root[1], root[2]
+        c1, c2 = root[0], root[1]
+        after_c1 = '(?<=' + re.escape(c1) + ')'
+        rules = []  # (regex, matched text, replacement)
         
-        # If C2 is weak (و or ي)
-        if c2 in MorphologicalEngine.WEAK_LETTERS:
-            # Pattern: C1aC2aC3 → C1āC3
-            # Replace weak radical with long ā
+        # Hollow roots: aC2 → ā, i+w → ī, u+y → ū (ū and ī are kept as is)
+        if MorphologicalEngine.is_weak_root(root)[0] == 'hollow':
             if c2 == 'و':
-                word = word.replace(c1 + 'َو', c1 + 'َا')
-                word = word.replace(c1 + 'ُو', c1 + 'ُو')  # Keep ū
-                word = word.replace(c1 + 'ِو', c1 + 'ِي')  # i+w→ī
+                rules.append((after_c1 + 'َو', 'َو', 'َا'))
+                rules.append((after_c1 + 'ِو', 'ِو', 'ِي'))
             elif c2 == 'ي':
-                word = word.replace(c1 + 'َي', c1 + 'َا')
-                word = word.replace(c1 + 'ِي', c1 + 'ِي')  # Keep ī
-                word = word.replace(c1 + 'ُي', c1 + 'ُو')  # u+y→ū
-        
-        return word
-    
-    @staticmethod
-    def apply_defective_root_rules(word: str, root: str) -> str:
-        """
-        Handle defective roots (C3 weak: و/ي)
+                rules.append((after_c1 + 'َي', 'َي', 'َا'))
+                rules.append((after_c1 + 'ُي', 'ُي', 'ُو'))
         
-        Rule: Final weak radical → ā in past tense
-        Examples:
-            رمي → رمى
-            دعو → دعا
-        """
-        if len(root) != 3:
-            return word
+        # A1: Emphatic spread (ت → ط)
+        if c1 in _EMPHATIC:
+            rules.append((after_c1 + 'ت', 'ت', 'ط'))
+        # A2/A3: Dental and ث idghām (assimilation with shadda)
+        elif c1 in _DENTAL or c1 == 'ث':
+            rules.append((after_c1 + 'ت', 'ت', 'ّ'))
         
-        c3 = root[2]
+        # B: Labial C1, n → m
+        if c1 in _LABIAL:
+            rules.append(('ن(?=' + re.escape(c1) + ')', 'ن', 'م'))
         
-        # If C3 is weak
-        if c3 in MorphologicalEngine.WEAK_LETTERS:
-            # Final weak → ى in many contexts
-            if word.endswith(c3):
-                word = word[:-1] + 'ى'
+        if not rules:
+            return None
         
-        return word
+        regex = re.compile('|'.join(rule for rule, _, _ in rules))
+        return regex, {matched: replacement for _, matched, replacement in rules}
     
     @staticmethod
     def apply_phonological_rules(word: str, root: str, pattern: str) -> str:
@@ -172,27 +189,34 @@ class MorphologicalEngine:
         # Step 1: Detect weakness
         weakness_type, position = MorphologicalEngine.is_weak_root(root)
         
-        # Step 2: Apply weak root rules
-        if weakness_type == 'hollow':
-            word = MorphologicalEngine.apply_hollow_root_rules(word, root)
-        elif weakness_type == 'defective':
+        # Step 2: Defective roots rewrite the final letter
+        if weakness_type == 'defective':
             word = MorphologicalEngine.apply_defective_root_rules(word, root)
         
-        # Step 3: Form VIII assimilation (افتعل)
-        word = MorphologicalEngine.apply_form8_assimilation(word, root)
-        
-        # Step 4: Form VII assimilation (انفعل)
-        word = MorphologicalEngine.apply_form7_assimilation(word, root)
+        # Steps 2-4: Hollow root rules, Form VIII (افتعل) and Form VII (انفعل)
+        # assimilation, fused into a single substitution pass per root
+        compiled = MorphologicalEngine.compile_root_rules(root)
+        if compiled:
+            regex, replacements = compiled
+            # Every match is one of the literal keys, so a substring probe
+            # skips the regex for the many words no rule touches
+            for matched in replacements:
+                if matched in word:
+                    word = regex.sub(lambda match: replacements[match.group()], word)
+                    break
         
         # Step 5: Clean up any double shaddas
-        word = word.replace('ّّ', 'ّ')
+        if 'ّّ' in word:
+            word = word.replace('ّّ', 'ّ')
         
         return word
     
     @staticmethod
+    @lru_cache(maxsize=200_000)
     def apply_root_to_pattern(root: str, pattern: str) -> str:
         """
         Apply a root to a pattern to generate a word
+        Pure function of (root, pattern), so results are memoized
         
         Supports pure Arabic morphological notation:
         - ف (Fa) = First root letter position
@@ -217,43 +241,12 @@ class MorphologicalEngine:
         if len(root) != 3:
             return ""
         
-        # Extract root letters
-        fa = root[0]      # Position 1 - First letter
-        ayn = root[1]     # Position 2 - Second letter
-        lam = root[2]     # Position 3 - Third letter
-        
-        result = ""
-        i = 0
-        
-        while i < len(pattern):
-            char = pattern[i]
-            
-            # Arabic morphological notation (standard linguistic)
-            if char == 'ف':      # Fa - First position
-                result += fa
-            elif char == 'ع':    # Ayn - Second position
-                result += ayn
-            elif char == 'ل':    # Lam - Third position
-                result += lam
-            # Numeric markers (1, 2, 3)
-            elif char == '1':
-                result += fa
-            elif char == '2':
-                result += ayn
-            elif char == '3':
-                result += lam
-            # English legacy support (F, A, L)
-            elif char == 'F':
-                result += fa
-            elif char == 'A':
-                result += ayn
-            elif char == 'L':
-                result += lam
-            # All other characters (diacritics, vowels, constants) pass through
-            else:
-                result += char
-            
-            i += 1
+        # Placeholders take the root letter at their position, all other
+        # characters (diacritics, vowels, constants) pass through
+        result = ''.join([
+            chunk + root[position] if position >= 0 else chunk
+            for chunk, position in _compile_template(pattern)
+        ])
         
         # Apply phonological/morphophonological rules
         result = MorphologicalEngine.apply_phonological_rules(result, root, pattern)
@@ -261,7 +254,46 @@ class MorphologicalEngine:
         return result
     
     @staticmethod
-    def validate_word(word: str, root: str, all_patterns: List[str]) -> Tuple[bool, Optional[str]]:
+    def candidate_patterns(word: str, root: str, patterns_by_length: Dict[int, Iterable[str]]) -> List[str]:
+        """
+        Narrow the patterns down to those that could generate word from root
+        
+        Every rule rewrites characters one for one, so a generated word is as
+        long as its template, unless the final clean-up collapses a doubled
+        shadda, which needs a shadda in the template or the root.
+        
+        Args:
+            word: The word to validate
+            root: The suspected root
+            patterns_by_length: Templates grouped by length
+        
+        Returns:
+            Candidate templates in sorted order (same order as all patterns)
+        """
+        length = len(word)
+        
+        if SHADDA in root:
+            candidates = [
+                template
+                for template_length, templates in patterns_by_length.items()
+                if template_length >= length
+                for template in templates
+            ]
+        else:
+            candidates = list(patterns_by_length.get(length, ()))
+            candidates += [
+                template
+                for template_length, templates in patterns_by_length.items()
+                if template_length > length
+                for template in templates
+                if SHADDA in template
+            ]
+        
+        candidates.sort()
+        return candidates
+    
+    @staticmethod
+    def validate_word(word: str, root: str, all_patterns: Sequence[str]) -> Tuple[bool, Optional[str]]:
         """
         Validate if a word can be derived from a root using any available pattern
         
@@ -286,7 +318,7 @@ class MorphologicalEngine:
         return False, None
     
     @staticmethod
-    def generate_derivatives(root: str, all_patterns: List[str]) -> List[dict]:
+    def generate_derivatives(root: str, all_patterns: Sequence[str]) -> List[Tuple[str, str]]:
         """
         Generate all possible derivatives of a root using all available patterns
         
@@ -295,7 +327,7 @@ class MorphologicalEngine:
             all_patterns: List of all available templates
         
         Returns:
-            List of {template, generated_word} dictionaries
+            List of (template, generated_word) tuples
         """
         derivatives = []
         
@@ -306,9 +338,6 @@ class MorphologicalEngine:
             generated_word = MorphologicalEngine.apply_root_to_pattern(root, template)
             
             if generated_word:
-                derivatives.append({
-                    "template": template,
-                    "generated_word": generated_word
-                })
+                derivatives.append((template, generated_word))
         
         return derivatives